@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+# Usage: flask --app pandas init-db && gunicorn pandas:app
+#
+# The app is preloaded in the master, so gevent has to patch the stdlib
+# here, before pandas.py and its dependencies are imported.
+from gevent import monkey
+monkey.patch_all()
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# Requests spend most of their time waiting on SQLite/Redis, so each worker
+# multiplexes many connections with gevent, and views stay synchronous.
+worker_class = 'gevent'
+worker_connections = 1000
+
+# Import the app and compile the SQLAlchemy mappers once in the master;
+# workers share that memory copy-on-write after the fork.
+preload_app = True
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master must not be shared with workers
+    from pandas import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,79 +1,599 @@
 # app.py
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, abort, g, request, jsonify, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_session import Session
+from flask_caching import Cache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from sqlalchemy import bindparam, lambda_stmt
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session as OrmSession, object_session
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
+from collections import namedtuple
+from datetime import timedelta
 from functools import wraps
+from threading import Lock
+from typing import Optional
+from cachetools import TTLCache
+from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+import click
+import msgspec
+import redis
+import hashlib
+import hmac
+import json
 import os
+import sqlite3
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///people.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///people.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,  # seconds
+}
+# Sized for gevent workers; LIFO keeps a small set of connections warm.
+# In-memory SQLite gets a StaticPool, which takes no sizing arguments.
+database_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+if not (database_url.get_backend_name() == 'sqlite'
+        and database_url.database in (None, '', ':memory:')):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(
+        pool_size=32,
+        max_overflow=64,
+        pool_use_lifo=True,
+    )
+app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+redis_client = redis.from_url(app.config['REDIS_URL'])
+
+# Server-side sessions, so the cookie only carries the session id
+app.config['SESSION_TYPE'] = 'redis'
+app.config['SESSION_REDIS'] = redis_client
+app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=8)
+
+# Short-lived response cache for person reads; writes invalidate it
+app.config['CACHE_TYPE'] = 'RedisCache'
+app.config['CACHE_REDIS_URL'] = app.config['REDIS_URL']
+app.config['CACHE_DEFAULT_TIMEOUT'] = 5  # seconds
+
+# Rate limit counters shared by all workers
+app.config['RATELIMIT_STORAGE_URI'] = app.config['REDIS_URL']
+
+# Behind Nginx every request arrives from the proxy, which would make the
+# per-IP login limit site-wide. Trust X-Forwarded-* from this many proxies.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
 
 db = SQLAlchemy(app)
+Session(app)
+cache = Cache(app)
+limiter = Limiter(get_remote_address, app=app, default_limits=[])
+
+@db.event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer, and synchronous=NORMAL
+    # skips the fsync on every commit (still safe in WAL mode)
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA cache_size=-64000')  # 64 MB
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')  # 256 MB
+    cursor.close()
+
+# Permission bits
+READ_PERMISSION = 1
+CREATE_PERMISSION = 2
+UPDATE_PERMISSION = 4
+DELETE_PERMISSION = 8
+ADMIN_PERMISSION = 16
 
-# Permission constants
-READ_PERMISSION = 'read'
-CREATE_PERMISSION = 'create'
-UPDATE_PERMISSION = 'update'
-DELETE_PERMISSION = 'delete'
+# Names used by the API for each bit
+PERMISSION_NAMES = {
+    'read': READ_PERMISSION,
+    'create': CREATE_PERMISSION,
+    'update': UPDATE_PERMISSION,
+    'delete': DELETE_PERMISSION,
+    'admin': ADMIN_PERMISSION,
+}
+
+# argon2id: 64 MB, 2 passes, one lane
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+def verify_password(password_hash, password):
+    # Hashes from before argon2 are werkzeug's PBKDF2/scrypt format
+    if not password_hash.startswith('$argon2'):
+        return check_password_hash(password_hash, password)
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+# Recently verified passwords, so repeated logins skip the KDF.
+# Entries map user id -> (password_hash, sha256(password)).
+PASSWORD_CACHE_TTL = 60  # seconds
+password_cache = TTLCache(maxsize=1024, ttl=PASSWORD_CACHE_TTL)
+password_cache_lock = Lock()
+
+def parse_permissions(permissions):
+    # 'read,create' -> READ_PERMISSION | CREATE_PERMISSION; unknown names are ignored
+    mask = 0
+    for name in permissions.split(','):
+        mask |= PERMISSION_NAMES.get(name.strip(), 0)
+    return mask
+
+def permission_names(mask):
+    return [name for name, bit in PERMISSION_NAMES.items() if mask & bit]
+
+class PermissionBits(db.TypeDecorator):
+    # Integer bitmask. Loaded values go through int() so a text value left in
+    # an unmigrated SQLite file fails here rather than in `mask & bit`.
+    impl = db.Integer
+    cache_ok = True
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else int(value)
 
 # Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
-    permissions = db.Column(db.String(500), default=READ_PERMISSION)  # Comma-separated permissions
+    permissions = db.Column(PermissionBits, default=READ_PERMISSION, nullable=False)  # Bitmask of *_PERMISSION
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        digest = hashlib.sha256(password.encode()).digest()
+        with password_cache_lock:
+            cached = password_cache.get(self.id)
+        
+        # Only trust the cache if it was filled against the current hash
+        if cached and cached[0] == self.password_hash and hmac.compare_digest(cached[1], digest):
+            return True
+        
+        if not verify_password(self.password_hash, password):
+            return False
+        
+        with password_cache_lock:
+            password_cache[self.id] = (self.password_hash, digest)
+        return True
+    
+    def needs_rehash(self):
+        return (not self.password_hash.startswith('$argon2')
+                or password_hasher.check_needs_rehash(self.password_hash))
     
     def has_permission(self, permission):
-        return permission in self.permissions.split(',')
+        return bool(self.permissions & permission)
 
 class Person(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
     phone = db.Column(db.String(20))
     address = db.Column(db.String(200))
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    
+    __table_args__ = (
+        db.Index('ix_person_created_email', 'created_by', 'email'),
+    )
+
+# Cache generations. A reader takes the generation before it reads the
+# database and stores under key:generation; writers bump it after commit,
+# so a value read before the write lands under a key nobody reads again.
+CACHE_GENERATION_TTL = 3600  # seconds; outlives every cached value
+
+def cache_generation_key(key):
+    return f'cache-generation:{key}'
+
+def versioned_key(key):
+    generation = redis_client.get(cache_generation_key(key))
+    return f'{key}:{int(generation or 0)}'
+
+def bump_cache_generations(pipe, *keys):
+    for key in keys:
+        pipe.incr(cache_generation_key(key))
+        pipe.expire(cache_generation_key(key), CACHE_GENERATION_TTL)
+
+# User lookups: process-local TTL cache, then Redis, then the database.
+# Mutations bump the Redis generation and tell every process to drop its copy.
+USER_CACHE_TTL = 30  # seconds
+USER_REDIS_TTL = 300  # seconds
+USER_CACHE_CHANNEL = 'user-cache-invalidate'
+user_cache = TTLCache(maxsize=10000, ttl=USER_CACHE_TTL)
+user_cache_lock = Lock()
+user_cache_listener_pid = None
+
+class CachedUser(namedtuple('CachedUser', 'id username permissions')):
+    __slots__ = ()
+    
+    def has_permission(self, permission):
+        return bool(self.permissions & permission)
+
+def user_cache_key(user_id):
+    return f'user-cache:{user_id}'
+
+def evict_cached_user(message):
+    with user_cache_lock:
+        user_cache.pop(int(message['data']), None)
+
+def start_user_cache_listener():
+    # One subscriber thread per process; checked by pid so forked
+    # workers start their own
+    global user_cache_listener_pid
+    with user_cache_lock:
+        if user_cache_listener_pid == os.getpid():
+            return
+        user_cache_listener_pid = os.getpid()
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{USER_CACHE_CHANNEL: evict_cached_user})
+    pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+def get_user_cached(user_id):
+    with user_cache_lock:
+        user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    start_user_cache_listener()
+    key = versioned_key(user_cache_key(user_id))
+    cached = redis_client.get(key)
+    if cached is not None:
+        data = json.loads(cached)
+    else:
+        row = db.session.get(User, user_id)
+        if not row:
+            return None
+        data = {'username': row.username, 'permissions': row.permissions}
+        redis_client.set(key, json.dumps(data), ex=USER_REDIS_TTL)
+    
+    user = CachedUser(user_id, data['username'], data['permissions'])
+    with user_cache_lock:
+        user_cache[user_id] = user
+    return user
+
+def current_user():
+    # Looked up at most once per request and shared by the decorator and the view
+    if 'current_user' not in g:
+        g.current_user = get_user_cached(session.get('user_id'))
+    return g.current_user
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def mark_cached_user_stale(mapper, connection, target):
+    # Evicted after commit: evicting at flush lets another request cache
+    # the old row again before the new one is visible
+    object_session(target).info.setdefault('stale_user_ids', set()).add(target.id)
+
+@db.event.listens_for(OrmSession, 'after_commit')
+def invalidate_cached_users(db_session):
+    stale_user_ids = db_session.info.pop('stale_user_ids', ())
+    if not stale_user_ids:
+        return
+    with redis_client.pipeline() as pipe:
+        for user_id in stale_user_ids:
+            with user_cache_lock:
+                user_cache.pop(user_id, None)
+            bump_cache_generations(pipe, user_cache_key(user_id))
+            pipe.publish(USER_CACHE_CHANNEL, user_id)
+        pipe.execute()
+
+@db.event.listens_for(OrmSession, 'after_rollback')
+def forget_stale_users(db_session):
+    db_session.info.pop('stale_user_ids', None)
+
+# Columns returned for a person by every endpoint
+PERSON_COLUMNS = (
+    Person.id, Person.name, Person.age, Person.email,
+    Person.phone, Person.address, Person.created_by
+)
+
+# Fields a client may change through PUT; id and created_by are not among them
+ALLOWED_PERSON_FIELDS = frozenset({'name', 'age', 'email', 'phone', 'address'})
+
+# JSON type of each writable field; phone and address may also be null
+PERSON_FIELD_TYPES = {'name': str, 'age': int, 'email': str, 'phone': str, 'address': str}
+REQUIRED_PERSON_FIELDS = ('name', 'age', 'email')
+
+class PersonOut(msgspec.Struct):
+    # Field order matches PERSON_COLUMNS, so rows unpack straight in
+    id: int
+    name: str
+    age: int
+    email: str
+    phone: Optional[str]
+    address: Optional[str]
+    created_by: Optional[int]
+
+def json_response(payload, status=200):
+    # msgspec encodes Structs straight to bytes, with no dict in between
+    return Response(msgspec.json.encode(payload), status=status, mimetype='application/json')
+
+PERSONS_CACHE_KEY = 'persons'
+PERSONS_BATCH_SIZE = 1000
+PERSONS_CACHE_MAX_BYTES = 1024 * 1024  # larger lists are streamed uncached
+
+def person_cache_key(id):
+    return f'person:{id}'
+
+def invalidate_person_cache(*ids):
+    # Called after commit; see cache generations above
+    with redis_client.pipeline() as pipe:
+        bump_cache_generations(pipe, PERSONS_CACHE_KEY, *(person_cache_key(id) for id in ids))
+        pipe.execute()
+
+def conditional_json(body):
+    # ETag over the encoded body; clients revalidate and get a 304 when unchanged
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.sha256(body).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def cache_stream(key, chunks, max_bytes):
+    # Pass a streamed body through, caching a copy if it stays under max_bytes
+    kept, size = [], 0
+    for chunk in chunks:
+        yield chunk
+        if kept is not None:
+            size += len(chunk)
+            if size > max_bytes:
+                kept = None
+            else:
+                kept.append(chunk)
+    if kept is not None:
+        cache.set(key, b''.join(kept))
+
+def conflict_insert(model):
+    # INSERT ... ON CONFLICT lives in the dialect-specific insert(); other
+    # databases get None and check the email before a plain INSERT
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    return None
+
+# Hot lookups, built once as lambda statements so each call skips
+# statement construction and goes straight to the compiled SQL cache
+person_by_id_stmt = lambda_stmt(
+    lambda: db.select(*PERSON_COLUMNS).where(Person.id == bindparam('id'))
+)
+# SELECT EXISTS(...) stops at the email index without reading the row
+email_exists_stmt = lambda_stmt(
+    lambda: db.select(db.exists().where(Person.email == bindparam('email')))
+)
+user_by_username_stmt = lambda_stmt(
+    lambda: db.select(User).where(User.username == bindparam('username'))
+)
+
+def person_row_or_404(id):
+    person = db.session.execute(person_by_id_stmt, {'id': id}).first()
+    if person is None:
+        abort(404)
+    return person
+
+def email_exists(email):
+    return db.session.scalar(email_exists_stmt, {'email': email})
+
+def user_by_username(username):
+    return db.session.scalars(user_by_username_stmt, {'username': username}).first()
+
+# Background writes: clients that send "Prefer: respond-async" (RFC 7240)
+# get a 202 right away and poll /api/jobs/<id>; an rq worker does the write
+write_queue = Queue('writes', connection=redis_client)
+
+def run_write(write, *args):
+    if 'respond-async' not in request.headers.get('Prefer', ''):
+        payload, status = write(*args)
+        return json_response(payload, status)
+    
+    job = write_queue.enqueue(run_write_job, write, *args,
+                              meta={'user_id': session['user_id']})
+    return json_response({
+        'status': 'queued',
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}'
+    }, 202)
+
+def run_write_job(write, *args):
+    # Runs in the rq worker, outside any request
+    with app.app_context():
+        payload, status = write(*args)
+    return {'status': status, 'body': msgspec.to_builtins(payload)}
+
+def person_fields_error(data, required=REQUIRED_PERSON_FIELDS):
+    # Shared by the create, bulk and update endpoints; updates require nothing
+    if not isinstance(data, dict):
+        return 'Expected a person object'
+    missing = [field for field in required if field not in data]
+    if missing:
+        return f'Missing fields: {", ".join(missing)}'
+    
+    invalid = []
+    for field, kind in PERSON_FIELD_TYPES.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if value is None and field not in REQUIRED_PERSON_FIELDS:
+            continue
+        # bool is an int subclass, but true is not an age
+        if not isinstance(value, kind) or isinstance(value, bool):
+            invalid.append(field)
+    if invalid:
+        return f'Invalid fields: {", ".join(invalid)}'
+    return None
+
+# How drivers name the unique email constraint in IntegrityError messages:
+# SQLite by column, PostgreSQL and MySQL by index or constraint name
+EMAIL_CONFLICT_MARKERS = ('person.email', 'ix_person_email', 'person_email_key')
+
+def is_email_conflict(error):
+    message = str(error.orig)
+    return any(marker in message for marker in EMAIL_CONFLICT_MARKERS)
+
+# Person writes, shared by the request handlers and the rq worker.
+# Each returns (payload, status).
+def write_create_person(data, user_id):
+    values = {
+        'name': data['name'],
+        'age': data['age'],
+        'email': data['email'],
+        'phone': data.get('phone'),
+        'address': data.get('address'),
+        'created_by': user_id
+    }
+    insert = conflict_insert(Person)
+    try:
+        if insert is not None:
+            # Insert and check the email in one round trip: a conflict on the
+            # unique email index inserts nothing and returns no row
+            row = db.session.execute(
+                insert.values(**values)
+                .on_conflict_do_nothing(index_elements=['email'])
+                .returning(*PERSON_COLUMNS)
+            ).first()
+            person = PersonOut(*row) if row is not None else None
+        elif email_exists(values['email']):
+            person = None
+        else:
+            result = db.session.execute(db.insert(Person).values(**values))
+            person = PersonOut(id=result.inserted_primary_key[0], **values)
+        if person is None:
+            return {'error': 'Email already exists'}, 400
+        db.session.commit()
+    except IntegrityError as error:
+        # Only the plain INSERT can race another insert of the same email
+        db.session.rollback()
+        if not is_email_conflict(error):
+            raise
+        return {'error': 'Email already exists'}, 400
+    invalidate_person_cache()
+    
+    return {'message': 'Person created successfully', 'person': person}, 201
+
+def write_update_person(id, data, current_email):
+    # current_email comes from the row the view already loaded, so the
+    # UPDATE ... RETURNING below is the only query in the usual case
+    if 'email' in data and data['email'] != current_email:
+        if email_exists(data['email']):
+            return {'error': 'Email already exists'}, 400
+    
+    # Update allowed fields with a single UPDATE, bypassing the unit of work
+    updates = {key: data[key] for key in ALLOWED_PERSON_FIELDS & data.keys()}
+    if updates:
+        update = (
+            db.update(Person)
+            .where(Person.id == id)
+            .values(**updates)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            if db.engine.dialect.update_returning:
+                person = db.session.execute(update.returning(*PERSON_COLUMNS)).first()
+            else:
+                db.session.execute(update)
+                person = db.session.execute(person_by_id_stmt, {'id': id}).first()
+            db.session.commit()
+        except IntegrityError as error:
+            # A queued write can run after the email was taken
+            db.session.rollback()
+            if not is_email_conflict(error):
+                raise
+            return {'error': 'Email already exists'}, 400
+    else:
+        person = db.session.execute(person_by_id_stmt, {'id': id}).first()
+    
+    # The row can be deleted before a queued write runs
+    if person is None:
+        return {'error': 'Person not found'}, 404
+    
+    if updates:
+        invalidate_person_cache(id)
+    return {'message': 'Person updated successfully', 'person': PersonOut(*person)}, 200
+
+def write_delete_person(id):
+    result = db.session.execute(db.delete(Person).where(Person.id == id))
+    if result.rowcount == 0:
+        return {'error': 'Person not found'}, 404
+    
+    db.session.commit()
+    invalidate_person_cache(id)
+    
+    return {'message': 'Person deleted successfully'}, 200
 
 # Permission decorator
+AUTH_REQUIRED_BODY = msgspec.json.encode({'error': 'Authentication required'})
+
 def permission_required(permission):
     def decorator(f):
+        # The permission is fixed at decoration time, so encode the 403 body once.
+        # Responses are still built per request since hooks may modify them.
+        required = ','.join(permission_names(permission))
+        denied_body = msgspec.json.encode({'error': f'Permission denied. Requires: {required}'})
+        
         @wraps(f)
         def decorated_function(*args, **kwargs):
             user_id = session.get('user_id')
             if not user_id:
-                return jsonify({'error': 'Authentication required'}), 401
+                return Response(AUTH_REQUIRED_BODY, status=401, mimetype='application/json')
             
-            user = User.query.get(user_id)
-            if not user or not user.has_permission(permission):
-                return jsonify({'error': f'Permission denied. Requires: {permission}'}), 403
+            # Permissions are stored in the session at login; only go to
+            # the database for sessions that don't carry them
+            permissions = session.get('permission_bits')
+            if permissions is None:
+                user = current_user()
+                if not user:
+                    return Response(AUTH_REQUIRED_BODY, status=401, mimetype='application/json')
+                permissions = session['permission_bits'] = user.permissions
+            
+            if not permissions & permission:
+                return Response(denied_body, status=403, mimetype='application/json')
             
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def login_username_key():
+    return 'login:' + str((request.get_json(silent=True) or {}).get('username', ''))
+
+@app.errorhandler(429)
+def too_many_requests(e):
+    return jsonify({'error': 'Too many attempts, try again later'}), 429
+
+def owns_or_admin(created_by):
+    # Pure session check: permission_required has already put the
+    # permission bits in the session, so no User lookup is needed
+    return (created_by == session.get('user_id')
+            or bool(session['permission_bits'] & ADMIN_PERMISSION))
+
 # Routes
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json()
     
-    if User.query.filter_by(username=data['username']).first():
+    if user_by_username(data['username']):
         return jsonify({'error': 'Username already exists'}), 400
     
     user = User(username=data['username'])
     user.set_password(data['password'])
     
     # Set permissions if provided, otherwise default to read only
-    permissions = data.get('permissions', READ_PERMISSION)
-    user.permissions = permissions
+    permissions = data.get('permissions', 'read')
+    user.permissions = parse_permissions(permissions)
     
     db.session.add(user)
     db.session.commit()
@@ -83,28 +603,42 @@ def register():
         'user': {
             'id': user.id,
             'username': user.username,
-            'permissions': user.permissions
+            'permissions': ','.join(permission_names(user.permissions))
         }
     }), 201
 
 @app.route('/api/login', methods=['POST'])
+# Checked before the view, so a blocked attempt never reaches the DB or the KDF.
+# The per-username bucket only counts failed logins.
+@limiter.limit('20/minute')
+@limiter.limit('5/minute', key_func=login_username_key,
+               deduct_when=lambda response: response.status_code == 401)
 def login():
     data = request.get_json()
-    user = User.query.filter_by(username=data['username']).first()
+    user = user_by_username(data['username'])
     
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
     
+    # Upgrade legacy or outdated hashes while we have the plaintext
+    if user.needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
+    # New session id on every login, so an id known before login (fixation)
+    # is never authenticated; stale keys from an earlier user go with it
+    app.session_interface.regenerate(session)
+    session.clear()
     session['user_id'] = user.id
     session['username'] = user.username
-    session['permissions'] = user.permissions
+    session['permission_bits'] = user.permissions
     
     return jsonify({
         'message': 'Logged in successfully',
         'user': {
             'id': user.id,
             'username': user.username,
-            'permissions': user.permissions
+            'permissions': ','.join(permission_names(user.permissions))
         }
     })
 
@@ -116,45 +650,46 @@ def logout():
 @app.route('/api/persons', methods=['GET'])
 @permission_required(READ_PERMISSION)
 def get_persons():
-    persons = Person.query.all()
-    
-    # For operator - show all persons with created_by info
-    persons_data = []
-    for person in persons:
-        person_data = {
-            'id': person.id,
-            'name': person.name,
-            'age': person.age,
-            'email': person.email,
-            'phone': person.phone,
-            'address': person.address,
-            'created_by': person.created_by
-        }
-        persons_data.append(person_data)
+    # The list is the same for every reader, so it is cached under one key
+    key = versioned_key(PERSONS_CACHE_KEY)
+    body = cache.get(key)
+    if body is not None:
+        return conditional_json(body)
     
-    return jsonify({'persons': persons_data})
+    def generate():
+        # Project the columns directly so no Person objects are hydrated,
+        # and fetch/encode a batch at a time so memory stays O(batch)
+        result = db.session.execute(
+            db.select(*PERSON_COLUMNS).execution_options(yield_per=PERSONS_BATCH_SIZE)
+        )
+        
+        # For operator - show all persons with created_by info
+        yield b'{"persons":['
+        for i, partition in enumerate(result.partitions()):
+            chunk = b','.join(msgspec.json.encode(PersonOut(*row)) for row in partition)
+            yield b',' + chunk if i else chunk
+        yield b']}'
+    
+    body = cache_stream(key, generate(), PERSONS_CACHE_MAX_BYTES)
+    return Response(stream_with_context(body), mimetype='application/json')
 
 @app.route('/api/persons/<int:id>', methods=['GET'])
 @permission_required(READ_PERMISSION)
 def get_person(id):
-    person = Person.query.get_or_404(id)
+    # Cached as (created_by, body) so the ownership check still runs per user
+    key = versioned_key(person_cache_key(id))
+    cached = cache.get(key)
+    if cached is None:
+        person = person_row_or_404(id)
+        cached = (person.created_by, msgspec.json.encode(PersonOut(*person)))
+        cache.set(key, cached)
+    created_by, body = cached
     
     # Check if user created this person or has all permissions
-    user_id = session.get('user_id')
-    user = User.query.get(user_id)
-    
-    if person.created_by != user_id and not user.has_permission('admin'):
+    if not owns_or_admin(created_by):
         return jsonify({'error': 'Access denied to this resource'}), 403
     
-    return jsonify({
-        'id': person.id,
-        'name': person.name,
-        'age': person.age,
-        'email': person.email,
-        'phone': person.phone,
-        'address': person.address,
-        'created_by': person.created_by
-    })
+    return conditional_json(body)
 
 @app.route('/api/persons', methods=['POST'])
 @permission_required(CREATE_PERMISSION)
@@ -162,107 +697,198 @@ def create_person():
     data = request.get_json()
     user_id = session.get('user_id')
     
-    # Check if email already exists
-    if Person.query.filter_by(email=data['email']).first():
-        return jsonify({'error': 'Email already exists'}), 400
+    # Validate up front so a queued write can't fail on a missing field
+    error = person_fields_error(data)
+    if error:
+        return jsonify({'error': error}), 400
     
-    person = Person(
-        name=data['name'],
-        age=data['age'],
-        email=data['email'],
-        phone=data.get('phone'),
-        address=data.get('address'),
-        created_by=user_id
-    )
+    return run_write(write_create_person, data, user_id)
+
+@app.route('/api/persons/bulk', methods=['POST'])
+@permission_required(CREATE_PERMISSION)
+def create_persons_bulk():
+    data = request.get_json()
+    user_id = session.get('user_id')
     
-    db.session.add(person)
-    db.session.commit()
+    if not isinstance(data, list) or not data:
+        return jsonify({'error': 'Expected a non-empty list of persons'}), 400
     
-    return jsonify({
-        'message': 'Person created successfully',
-        'person': {
-            'id': person.id,
-            'name': person.name,
-            'age': person.age,
-            'email': person.email,
-            'phone': person.phone,
-            'address': person.address,
-            'created_by': person.created_by
+    for index, item in enumerate(data):
+        error = person_fields_error(item)
+        if error:
+            return jsonify({'error': error, 'index': index}), 400
+    
+    rows = [
+        {
+            'name': item['name'],
+            'age': item['age'],
+            'email': item['email'],
+            'phone': item.get('phone'),
+            'address': item.get('address'),
+            'created_by': user_id
         }
-    }), 201
+        for item in data
+    ]
+    
+    emails = [row['email'] for row in rows]
+    if len(set(emails)) != len(emails):
+        return jsonify({'error': 'Duplicate emails in request'}), 400
+    
+    # One query for every email instead of one probe per row
+    existing = db.session.scalars(
+        db.select(Person.email).where(Person.email.in_(emails))
+    ).all()
+    if existing:
+        return jsonify({'error': 'Email already exists', 'emails': existing}), 400
+    
+    # Single executemany INSERT in one transaction. A concurrent insert can
+    # still take one of the emails between the check and the INSERT.
+    try:
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            persons = [
+                PersonOut(*person) for person in db.session.execute(
+                    db.insert(Person).returning(*PERSON_COLUMNS, sort_by_parameter_order=True),
+                    rows
+                )
+            ]
+        else:
+            # No RETURNING for executemany: one INSERT per row to get the ids
+            persons = [
+                PersonOut(id=db.session.execute(db.insert(Person).values(**row))
+                          .inserted_primary_key[0], **row)
+                for row in rows
+            ]
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        if not is_email_conflict(error):
+            raise
+        return jsonify({'error': 'Email already exists'}), 400
+    invalidate_person_cache()
+    
+    return json_response({
+        'message': f'{len(persons)} persons created successfully',
+        'persons': persons
+    }, 201)
 
 @app.route('/api/persons/<int:id>', methods=['PUT'])
 @permission_required(UPDATE_PERMISSION)
 def update_person(id):
-    person = Person.query.get_or_404(id)
+    person = person_row_or_404(id)
     data = request.get_json()
-    user_id = session.get('user_id')
     
     # Check if user created this person or has all permissions
-    user = User.query.get(user_id)
-    if person.created_by != user_id and not user.has_permission('admin'):
+    if not owns_or_admin(person.created_by):
         return jsonify({'error': 'Cannot update this person'}), 403
     
-    # Check if email is being changed to an existing email
-    if 'email' in data and data['email'] != person.email:
-        if Person.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 400
+    # Validate up front so a queued write can't fail on a bad value
+    error = person_fields_error(data, required=())
+    if error:
+        return jsonify({'error': error}), 400
     
-    # Update fields
-    for key, value in data.items():
-        if hasattr(person, key):
-            setattr(person, key, value)
-    
-    db.session.commit()
-    
-    return jsonify({
-        'message': 'Person updated successfully',
-        'person': {
-            'id': person.id,
-            'name': person.name,
-            'age': person.age,
-            'email': person.email,
-            'phone': person.phone,
-            'address': person.address,
-            'created_by': person.created_by
-        }
-    })
+    return run_write(write_update_person, id, data, person.email)
 
 @app.route('/api/persons/<int:id>', methods=['DELETE'])
 @permission_required(DELETE_PERMISSION)
 def delete_person(id):
-    person = Person.query.get_or_404(id)
-    user_id = session.get('user_id')
+    person = person_row_or_404(id)
     
     # Check if user created this person or has all permissions
-    user = User.query.get(user_id)
-    if person.created_by != user_id and not user.has_permission('admin'):
+    if not owns_or_admin(person.created_by):
         return jsonify({'error': 'Cannot delete this person'}), 403
     
-    db.session.delete(person)
-    db.session.commit()
+    return run_write(write_delete_person, id)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
     
-    return jsonify({'message': 'Person deleted successfully'})
+    try:
+        job = Job.fetch(job_id, connection=redis_client)
+    except NoSuchJobError:
+        job = None
+    # Only the user who queued a job can see it
+    if job is None or job.meta.get('user_id') != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    status = job.get_status()
+    payload = {'status': status}
+    if status == 'finished':
+        payload['result'] = job.return_value()
+    return jsonify(payload)
 
 @app.route('/api/user/permissions', methods=['GET'])
 def get_user_permissions():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get(session['user_id'])
+    user = current_user()
     return jsonify({
         'username': user.username,
-        'permissions': user.permissions.split(',')
+        'permissions': permission_names(user.permissions)
     })
 
+def stored_permissions(value):
+    # Old rows hold names ('read,create'); masks written as text ('31') are
+    # already bits and must not be parsed as names
+    if value is None:
+        return READ_PERMISSION
+    if isinstance(value, int) or value.strip().isdigit():
+        return int(value)
+    return parse_permissions(value)
+
+def migrate_permissions():
+    # SQLite files from before the bitmask still declare permissions as
+    # VARCHAR, whose TEXT affinity stores every value as a string. Rebuild
+    # the column as INTEGER; a database that already has one is left alone.
+    if db.engine.dialect.name != 'sqlite':
+        return
+    columns = db.session.execute(db.text('PRAGMA table_info("user")')).all()
+    declared = {column.name: column.type.upper() for column in columns}
+    if declared.get('permissions', 'INTEGER') == 'INTEGER':
+        return
+    
+    rows = db.session.execute(db.text('SELECT id, permissions FROM "user"')).all()
+    db.session.execute(db.text(
+        'ALTER TABLE "user" ADD COLUMN permission_bits INTEGER NOT NULL DEFAULT 1'
+    ))
+    if rows:
+        db.session.execute(
+            db.text('UPDATE "user" SET permission_bits = :bits WHERE id = :id'),
+            [{'id': id, 'bits': stored_permissions(value)} for id, value in rows]
+        )
+    db.session.execute(db.text('ALTER TABLE "user" DROP COLUMN permissions'))
+    db.session.execute(db.text(
+        'ALTER TABLE "user" RENAME COLUMN permission_bits TO permissions'
+    ))
+    db.session.commit()
+
+def create_missing_indexes():
+    # create_all skips tables that already exist, so databases from older
+    # versions never get indexes added to the models since
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+@app.cli.command('init-db')
+def init_db():
+    """Create the tables and indexes, migrate old rows and seed the admin user."""
+    # Run once per deploy rather than at every worker start
+    db.create_all()
+    migrate_permissions()
+    create_missing_indexes()
+    # Create default admin user if not exists
+    if not user_by_username('admin'):
+        admin = User(username='admin')
+        admin.set_password('admin123')
+        admin.permissions = (READ_PERMISSION | CREATE_PERMISSION | UPDATE_PERMISSION
+                             | DELETE_PERMISSION | ADMIN_PERMISSION)
+        db.session.add(admin)
+        db.session.commit()
+    click.echo('Database initialized.')
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        # Create default admin user if not exists
-        if not User.query.filter_by(username='admin').first():
-            admin = User(username='admin')
-            admin.set_password('admin123')
-            admin.permissions = 'read,create,update,delete,admin'
-            db.session.add(admin)
-            db.session.commit()
-    app.run(debug=True)
\ No newline at end of file
+    # Local development only; use `flask --app pandas run --debug` for the
+    # debugger and gunicorn (see gunicorn.conf.py) in production
+    app.run()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import importlib
+import sys
+from pathlib import Path
+
+import fakeredis
+import pytest
+import redis
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def load_app(tmp_path, monkeypatch):
+    # pandas.py configures everything at import, so each test imports a fresh
+    # copy against its own SQLite file and an in-process Redis
+    server = fakeredis.FakeServer()
+    fake_from_url = lambda *args, **kwargs: fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(redis, 'from_url', fake_from_url)
+    monkeypatch.setattr(redis.Redis, 'from_url', staticmethod(fake_from_url))
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path / "people.db"}')
+    monkeypatch.syspath_prepend(str(ROOT))
+    loaded = []
+    
+    def load():
+        sys.modules.pop('pandas', None)
+        module = importlib.import_module('pandas')
+        loaded.append(module)
+        return module
+    
+    yield load
+    for module in loaded:
+        with module.app.app_context():
+            module.db.engine.dispose()
+    sys.modules.pop('pandas', None)
@@ -0,0 +1,183 @@
+import pytest
+from rq import SimpleWorker
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+@pytest.fixture
+def app_module(load_app):
+    module = load_app()
+    with module.app.app_context():
+        module.db.create_all()
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def login(client, username, permissions='read,create,update,delete'):
+    client.post('/api/register', json={
+        'username': username, 'password': 'pw', 'permissions': permissions
+    })
+    response = client.post('/api/login', json={'username': username, 'password': 'pw'})
+    assert response.status_code == 200
+    return response
+
+
+def person(email, **fields):
+    return {'name': 'Ann', 'age': 30, 'email': email, **fields}
+
+
+def run_worker(app_module):
+    SimpleWorker([app_module.write_queue], connection=app_module.redis_client).work(burst=True)
+
+
+def test_bulk_create_returns_rows_in_order(client):
+    login(client, 'alice')
+    response = client.post('/api/persons/bulk', json=[
+        person('a@example.com'), person('b@example.com', phone='123')
+    ])
+    assert response.status_code == 201
+    persons = response.get_json()['persons']
+    assert [p['email'] for p in persons] == ['a@example.com', 'b@example.com']
+    assert persons[1]['phone'] == '123'
+
+
+def test_bulk_create_rejects_duplicate_emails(client):
+    login(client, 'alice')
+    response = client.post('/api/persons/bulk', json=[
+        person('a@example.com'), person('a@example.com')
+    ])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Duplicate emails in request'
+    
+    client.post('/api/persons', json=person('b@example.com'))
+    response = client.post('/api/persons/bulk', json=[
+        person('c@example.com'), person('b@example.com')
+    ])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Email already exists', 'emails': ['b@example.com']}
+    
+    # Nothing from a rejected batch is written
+    emails = [p['email'] for p in client.get('/api/persons').get_json()['persons']]
+    assert emails == ['b@example.com']
+
+
+@pytest.mark.parametrize('item, error', [
+    (5, 'Expected a person object'),
+    ({'name': 'Ann'}, 'Missing fields: age, email'),
+    ({'name': None, 'age': 3, 'email': 'n@example.com'}, 'Invalid fields: name'),
+    ({'name': 'Ann', 'age': True, 'email': 'n@example.com'}, 'Invalid fields: age'),
+])
+def test_bulk_create_rejects_invalid_items(client, item, error):
+    login(client, 'alice')
+    response = client.post('/api/persons/bulk', json=[person('a@example.com'), item])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error, 'index': 1}
+
+
+@pytest.mark.parametrize('body', [{'name': None}, {'age': None}, {'age': '3'}, [1]])
+def test_update_rejects_invalid_body(client, body):
+    login(client, 'alice')
+    client.post('/api/persons', json=person('a@example.com'))
+    response = client.put('/api/persons/1', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] != 'Email already exists'
+
+
+def test_queued_writes_report_results(app_module, client):
+    login(client, 'alice')
+    client.post('/api/persons', json=person('a@example.com'))
+    
+    jobs = [
+        client.post('/api/persons', json=person('b@example.com'), headers=ASYNC),
+        client.put('/api/persons/1', json={'age': 31}, headers=ASYNC),
+        client.delete('/api/persons/1', headers=ASYNC),
+    ]
+    assert [job.status_code for job in jobs] == [202, 202, 202]
+    job_ids = [job.get_json()['job_id'] for job in jobs]
+    assert client.get(f'/api/jobs/{job_ids[0]}').get_json() == {'status': 'queued'}
+    
+    run_worker(app_module)
+    results = [client.get(f'/api/jobs/{job_id}').get_json() for job_id in job_ids]
+    assert all(result['status'] == 'finished' for result in results)
+    created, updated, deleted = (result['result'] for result in results)
+    assert created['status'] == 201
+    assert created['body']['person']['email'] == 'b@example.com'
+    assert updated['status'] == 200
+    assert updated['body']['person']['age'] == 31
+    assert deleted == {'status': 200, 'body': {'message': 'Person deleted successfully'}}
+    assert client.get('/api/persons/1').status_code == 404
+
+
+def test_queued_update_of_deleted_person_is_not_found(app_module, client):
+    login(client, 'alice')
+    client.post('/api/persons', json=person('a@example.com'))
+    job_id = client.put('/api/persons/1', json={'age': 31}, headers=ASYNC).get_json()['job_id']
+    client.delete('/api/persons/1')
+    
+    run_worker(app_module)
+    result = client.get(f'/api/jobs/{job_id}').get_json()['result']
+    assert result == {'status': 404, 'body': {'error': 'Person not found'}}
+
+
+def test_jobs_are_only_visible_to_their_owner(app_module, client):
+    login(client, 'alice')
+    job_id = client.post(
+        '/api/persons', json=person('a@example.com'), headers=ASYNC
+    ).get_json()['job_id']
+    run_worker(app_module)
+    assert client.get(f'/api/jobs/{job_id}').status_code == 200
+    
+    other = app_module.app.test_client()
+    login(other, 'bob')
+    assert other.get(f'/api/jobs/{job_id}').status_code == 404
+    assert other.get('/api/jobs/no-such-job').status_code == 404
+
+
+def test_person_etag_revalidates_until_updated(client):
+    login(client, 'alice')
+    client.post('/api/persons', json=person('a@example.com'))
+    
+    etag = client.get('/api/persons/1').headers['ETag']
+    response = client.get('/api/persons/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    
+    client.put('/api/persons/1', json={'age': 31})
+    response = client.get('/api/persons/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['age'] == 31
+
+
+def test_person_list_etag_once_cached(client):
+    login(client, 'alice')
+    client.post('/api/persons', json=person('a@example.com'))
+    
+    # The first read streams and fills the cache; later reads carry an ETag
+    client.get('/api/persons').get_data()
+    etag = client.get('/api/persons').headers['ETag']
+    assert client.get('/api/persons', headers={'If-None-Match': etag}).status_code == 304
+    
+    client.post('/api/persons', json=person('b@example.com'))
+    response = client.get('/api/persons', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()['persons']) == 2
+
+
+def test_login_limited_per_username_after_failures(client):
+    client.post('/api/register', json={'username': 'alice', 'password': 'pw'})
+    client.post('/api/register', json={'username': 'bob', 'password': 'pw'})
+    for _ in range(5):
+        response = client.post('/api/login', json={'username': 'alice', 'password': 'bad'})
+        assert response.status_code == 401
+    
+    response = client.post('/api/login', json={'username': 'alice', 'password': 'pw'})
+    assert response.status_code == 429
+    assert response.get_json() == {'error': 'Too many attempts, try again later'}
+    
+    # Other usernames from the same address are unaffected
+    response = client.post('/api/login', json={'username': 'bob', 'password': 'pw'})
+    assert response.status_code == 200
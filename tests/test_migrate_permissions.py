@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+# Schema and rows as written by the version that stored comma-separated names
+BASELINE_SCHEMA = '''
+CREATE TABLE user (
+    id INTEGER NOT NULL,
+    username VARCHAR(80) NOT NULL,
+    password_hash VARCHAR(200) NOT NULL,
+    permissions VARCHAR(500),
+    PRIMARY KEY (id),
+    UNIQUE (username)
+);
+CREATE TABLE person (
+    id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    age INTEGER NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    phone VARCHAR(20),
+    address VARCHAR(200),
+    created_by INTEGER,
+    PRIMARY KEY (id),
+    UNIQUE (email),
+    FOREIGN KEY(created_by) REFERENCES user (id)
+);
+'''
+
+BASELINE_USERS = [
+    (1, 'admin', 'read,create,update,delete,admin'),
+    (2, 'reader', 'read'),
+    (3, 'editor', 'read, create,update'),
+    (4, 'legacy', None),
+    (5, 'converted', '31'),  # written as text by an earlier migration
+]
+
+
+@pytest.fixture
+def app_module(tmp_path, load_app):
+    connection = sqlite3.connect(tmp_path / 'people.db')
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany(
+        "INSERT INTO user (id, username, password_hash, permissions) VALUES (?, ?, 'x', ?)",
+        BASELINE_USERS,
+    )
+    connection.execute(
+        "INSERT INTO person (name, age, email, created_by) VALUES ('Ann', 30, 'ann@example.com', 2)"
+    )
+    connection.commit()
+    connection.close()
+    return load_app()
+
+
+def test_migrate_permissions_twice(app_module):
+    app = app_module.app
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+    
+    with app.app_context():
+        db = app_module.db
+        declared = {
+            column.name: column.type
+            for column in db.session.execute(db.text('PRAGMA table_info("user")'))
+        }
+        assert declared['permissions'] == 'INTEGER'
+        
+        rows = dict(db.session.execute(db.text(
+            'SELECT username, typeof(permissions) FROM "user"'
+        )).all())
+        assert set(rows.values()) == {'integer'}
+        
+        users = {user.username: user for user in app_module.User.query.all()}
+        assert users['admin'].permissions == 31
+        assert users['reader'].permissions == app_module.READ_PERMISSION
+        assert users['editor'].permissions == 7
+        assert users['legacy'].permissions == app_module.READ_PERMISSION
+        assert users['converted'].permissions == 31
+        assert users['editor'].has_permission(app_module.UPDATE_PERMISSION)
+        
+        # Foreign keys into user survive the column rebuild
+        assert db.session.execute(db.text('SELECT created_by FROM person')).scalar() == 2
+        
+        # create_all left the existing person table alone; init-db adds its indexes
+        indexes = {row.name for row in db.session.execute(db.text('PRAGMA index_list("person")'))}
+        assert {'ix_person_email', 'ix_person_created_by', 'ix_person_created_email'} <= indexes